@@ -31,18 +31,14 @@ def install_requirements():
         sys.exit(1)
     
     print("Installing dependencies...")
-    print("  Step 1/3: Upgrading pip...", end=" ", flush=True)
+    print("  Step 1/2: Upgrading pip...", end=" ", flush=True)
     subprocess.run([python_cmd, "-m", "pip", "install", "--upgrade", "pip", "--quiet"], check=True)
     print("complete")
 
-    print("  Step 2/3: Installing requirements from requirements.txt...", end=" ", flush=True)
+    print("  Step 2/2: Installing requirements from requirements.txt...", end=" ", flush=True)
     subprocess.run([python_cmd, "-m", "pip", "install", "-r", "requirements.txt", "--quiet"], check=True)
     print("complete")
 
-    print("  Step 3/3: Downloading spaCy model...", end=" ", flush=True)
-    subprocess.run([python_cmd, "-m", "spacy", "download", "en_core_web_sm", "--quiet"], check=True)
-    print("complete")
-
 def download_cci_xml():
     python_cmd = get_python_cmd()
     os.makedirs(KNOWLEDGE_DIR, exist_ok=True)
@@ -8,12 +8,14 @@ from .data_fetchers import fetch_json_data, fetch_excel_data
 from .parsers import (
     extract_controls_from_json, extract_controls_from_excel,
     extract_high_baseline_controls, extract_assessment_procedures,
-    load_cci_mapping, load_stig_data, normalize_control_id
+    load_cci_mapping, load_stig_data, normalize_control_id,
+    build_nist_to_ccis
 )
 from .vector_store import build_vector_store, retrieve_documents
-from .response_generator import generate_response
+from .response_generator import generate_response, build_stig_index
 
-init()
+# Honor NO_COLOR (https://no-color.org); otherwise colorama strips codes itself when stdout is not a terminal
+init(strip=True if os.environ.get('NO_COLOR') else None)
 KNOWLEDGE_DIR = 'knowledge'
 os.makedirs(KNOWLEDGE_DIR, exist_ok=True)
 logging.basicConfig(
@@ -72,18 +74,20 @@ def main():
         f"NIST 800-53 Rev 5 Catalog, {ctrl['control_id']}: {ctrl['title']} {ctrl['description']}"
         for ctrl in catalog_data
     ] + [
-        f"NIST 800-53 Rev 5 Assessment, {ctrl['control_id']}: To assess this control, verify {ctrl['description'].lower()} Check parameters: {', '.join(ctrl['parameters']) if ctrl['parameters'] else 'none specified'}."
+        f"NIST 800-53 Rev 5 Assessment, {ctrl['control_id']}: To assess this control, verify {ctrl['description'].lower()} Check parameters: {ctrl['parameters_text'] or 'none specified'}."
         for ctrl in catalog_data
     ] + high_baseline_data
 
     print(f"{Fore.CYAN}Building new vector store...{Style.RESET_ALL}")
-    model, index, doc_list = build_vector_store(all_documents, args.model, KNOWLEDGE_DIR)
+    model, index, doc_list, doc_control_ids = build_vector_store(all_documents, args.model, KNOWLEDGE_DIR)
 
     print(f"{Fore.CYAN}Loading CCI-to-NIST mapping...{Style.RESET_ALL}")
     cci_to_nist = load_cci_mapping(os.path.join(KNOWLEDGE_DIR, 'U_CCI_List.xml'))
+    nist_to_ccis = build_nist_to_ccis(cci_to_nist)
 
     print(f"{Fore.CYAN}Loading STIG data from folder: {stig_folder}{Style.RESET_ALL}")
     all_stig_recommendations, available_stigs = load_stig_data(stig_folder, cci_to_nist)
+    stig_index = build_stig_index(available_stigs, all_stig_recommendations)
     logging.debug(f"Loaded {len(available_stigs)} STIGs: {[stig['file'] for stig in available_stigs]}")
 
     control_details = {ctrl['control_id']: ctrl for ctrl in catalog_data}
@@ -130,9 +134,9 @@ def main():
                 print("Please enter 'y' for yes or 'n' for no.")
 
         print(f"\n{Fore.CYAN}Processing...{Style.RESET_ALL}")
-        retrieved_docs = retrieve_documents(query, model, index, doc_list)
+        retrieved_docs = retrieve_documents(query, model, index, doc_list, doc_control_ids=doc_control_ids)
         
-        response = generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=generate_checklist)
+        response = generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=generate_checklist, nist_to_ccis=nist_to_ccis, stig_index=stig_index)
         
         # Handle clarification prompts
         if "Multiple STIG technologies available" in response or "CLARIFICATION_NEEDED" in response:
@@ -151,7 +155,7 @@ def main():
                     break
                 print(f"Please enter a number between 0 and {num_options}.")
             query += f" with technology index {tech_choice}"
-            response = generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=generate_checklist)
+            response = generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=generate_checklist, nist_to_ccis=nist_to_ccis, stig_index=stig_index)
         
         if "not found" in response.lower() or "no specific" in response.lower() or len(retrieved_docs) == 0:
             save_unknown_query(query)
@@ -4,11 +4,20 @@ import pandas as pd
 import xml.etree.ElementTree as ET
 import logging
 import glob
+from collections import defaultdict
+from functools import lru_cache
 
+# normalize_control_id patterns: control with subparts (e.g. 'AC-1 A 1 (A)'), then plain/enhanced control
+_CONTROL_SUBPART_RE = re.compile(r'^([A-Z]{2})-0*([0-9]+)(?:\s+[A-Z0-9]+(?:\s+\([a-z0-9]+\))?)?$', re.IGNORECASE)
+_CONTROL_ENHANCEMENT_RE = re.compile(r'^([A-Z]{2})-0*([0-9]+)(?:\s*\(([a-z0-9]+)\))?$', re.IGNORECASE)
+
+@lru_cache(maxsize=2048)
 def normalize_control_id(control_id):
     """
     Normalize a NIST control ID by removing leading zeros, subparts, spaces, and preserving enhancements.
 
+    Results are memoized, since the same IDs recur across the catalog, CCI list and STIG references.
+
     Args:
         control_id (str): The control ID to normalize (e.g., 'AC-01', 'CM-7(5)', 'AC-1 A 1 (A)').
 
@@ -22,12 +31,12 @@ def normalize_control_id(control_id):
         'CM-7(5)'
     """
     # Match family (e.g., AC), number (e.g., 1), and optional enhancement (e.g., (5))
-    match = re.match(r'^([A-Z]{2})-0*([0-9]+)(?:\s+[A-Z0-9]+(?:\s+\([a-z0-9]+\))?)?$', control_id, re.IGNORECASE)
+    match = _CONTROL_SUBPART_RE.match(control_id)
     if match:
         family, number = match.groups()
         return f"{family.upper()}-{number}"
     # Fallback for simpler cases or enhancements
-    match = re.match(r'^([A-Z]{2})-0*([0-9]+)(?:\s*\(([a-z0-9]+)\))?$', control_id, re.IGNORECASE)
+    match = _CONTROL_ENHANCEMENT_RE.match(control_id)
     if match:
         family, number, enhancement = match.groups()
         return f"{family.upper()}-{number}" + (f"({enhancement})" if enhancement else "")
@@ -40,12 +49,15 @@ def extract_controls_from_excel(excel_file):
         control_id = str(row[0]).upper()
         if not re.match(r'[A-Z]{2}-[0-9]+', control_id):
             continue
+        related_controls = [normalize_control_id(ctrl.upper()) for ctrl in str(row[4]).split(', ') if ctrl.strip()] if pd.notna(row[4]) else []
         controls.append({
             'control_id': control_id,
             'title': str(row[1]),
             'description': str(row[2]),
             'parameters': [],
-            'related_controls': [normalize_control_id(ctrl.upper()) for ctrl in str(row[4]).split(', ') if ctrl.strip()] if pd.notna(row[4]) else []
+            'related_controls': related_controls,
+            'parameters_text': '',
+            'related_controls_text': ', '.join(related_controls)
         })
     logging.info(f"Loaded {len(controls)} controls from NIST 800-53 Rev 5 Excel catalog.")
     return controls
@@ -68,7 +80,9 @@ def extract_controls_from_json(json_data):
                 'title': title,
                 'description': description,
                 'parameters': param_texts,
-                'related_controls': related_controls
+                'related_controls': related_controls,
+                'parameters_text': ', '.join(param_texts),
+                'related_controls_text': ', '.join(related_controls)
             })
     logging.info(f"Loaded {len(controls)} controls from NIST 800-53 Rev 5 JSON catalog.")
     return controls
@@ -139,6 +153,26 @@ def load_cci_mapping(cci_xml_path):
         logging.warning("Falling back to hardcoded CCI-to-NIST dictionary")
     return cci_to_nist
 
+def build_nist_to_ccis(cci_to_nist):
+    """
+    Build a reverse index from normalized NIST control IDs to the CCIs mapped to them.
+
+    Args:
+        cci_to_nist (dict): CCI-to-NIST mapping as returned by load_cci_mapping.
+
+    Returns:
+        dict: A dictionary mapping normalized NIST control IDs to lists of CCI IDs, in mapping order.
+
+    Example:
+        >>> nist_to_ccis = build_nist_to_ccis({'CCI-000130': 'AU-3', 'CCI-000131': 'AU-3'})
+        >>> print(nist_to_ccis.get('AU-3'))
+        ['CCI-000130', 'CCI-000131']
+    """
+    nist_to_ccis = defaultdict(list)
+    for cci_id, control_id in cci_to_nist.items():
+        nist_to_ccis[normalize_control_id(control_id)].append(cci_id)
+    return dict(nist_to_ccis)
+
 def parse_stig_xccdf(xccdf_data, cci_to_nist):
     stig_recommendations = {}
     try:
@@ -168,6 +202,7 @@ def parse_stig_xccdf(xccdf_data, cci_to_nist):
         
         for rule in rules:
             rule_id = rule.get('id')
+            severity = rule.get('severity', 'medium').capitalize()
             title_elem = rule.find('.//xccdf:title', ns)
             title_text = title_elem.text if title_elem is not None else "No title"
             fix_elem = rule.find('.//xccdf:fix', ns)
@@ -185,9 +220,10 @@ def parse_stig_xccdf(xccdf_data, cci_to_nist):
                         stig_recommendations[control_id].append({
                             'rule_id': rule_id,
                             'title': title_text,
-                            'fix': fix_text
+                            'fix': fix_text,
+                            'severity': severity
                         })
-                    logging.debug(f"Mapped {cci_id} to {control_id} for rule {rule_id}")
+                    logging.debug("Mapped %s to %s for rule %s", cci_id, control_id, rule_id)
         
         logging.info(f"Parsed STIG data for {technology}: {len(stig_recommendations)} controls mapped")
         return stig_recommendations, technology, title, benchmark_id, version
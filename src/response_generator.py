@@ -1,11 +1,24 @@
 import re
 import csv
+import io
 import os
+import sys
 import logging
-from datetime import datetime
+import time
+from collections import defaultdict
+from functools import lru_cache
+from itertools import chain, islice
 from colorama import Fore, Style
 from .text_processing import extract_actionable_steps
-from .parsers import normalize_control_id
+from .parsers import normalize_control_id, build_nist_to_ccis
+
+# Color codes bound once so hot formatting paths avoid repeated attribute lookups.
+# Output that is piped or redirected, or runs with NO_COLOR set (https://no-color.org), gets no ANSI codes.
+_USE_COLOR = sys.stdout.isatty() and not os.environ.get('NO_COLOR')
+if _USE_COLOR:
+    _C_CYAN, _C_YELLOW, _C_RED, _C_GREEN, _C_WHITE, _RST = Fore.CYAN, Fore.YELLOW, Fore.RED, Fore.GREEN, Fore.WHITE, Style.RESET_ALL
+else:
+    _C_CYAN = _C_YELLOW = _C_RED = _C_GREEN = _C_WHITE = _RST = ""
 
 family_purposes = {
     "AC": "manage access to information systems and resources",
@@ -30,130 +43,276 @@ family_purposes = {
     "SR": "manage supply chain risks",
 }
 
+CHECKLIST_DIR = "assessment_checklists"
+# Rows are formatted in memory and handed over a batch at a time; a 64 KiB file buffer
+# coalesces small batches so typical checklists reach the disk in a single write() call.
+CHECKLIST_BUFFER_SIZE = 64 * 1024
+_CHECKLIST_HEADER = ("Source", "Control/Rule", "Action", "Assessment Task", "Severity", "Expected Evidence", "Status")
+# Rows are formatted this many at a time, which bounds memory for very large checklists.
+CHECKLIST_BATCH_ROWS = 1024
+
+# Shared read-only default for missing technologies in STIG recommendation lookups
+_EMPTY = {}
+
 severity_colors = {
-    'High': Fore.RED,
-    'Medium': Fore.YELLOW,
-    'Low': Fore.GREEN
+    'High': _C_RED,
+    'Medium': _C_YELLOW,
+    'Low': _C_GREEN
 }
 
+# Per-control output lines (newline included), with the color codes baked in once at import
+_CONTROL_HDR = f"{_C_YELLOW}1. {{}} - {{}}{_RST}\n"
+_UNKNOWN_CONTROL_HDR = f"{_C_YELLOW}1. {{}}{_RST}\n"
+_ASSESS_HDR = f"{_C_CYAN}   Steps to Assess:{_RST}\n"
+_IMPLEMENT_HDR = f"{_C_CYAN}   How to Implement:{_RST}\n"
+_STIG_CHECKS_HDR = f"{_C_CYAN}   STIG Checks for {{}}:{_RST}\n"
+_STIG_GUIDANCE_HDR = f"{_C_CYAN}   STIG Guidance for {{}}:{_RST}\n"
+_VERIFY_LINE = f"        - {_C_GREEN}Verify:{_RST} {{}}\n"
+_APPLY_LINE = f"        - {_C_GREEN}Apply:{_RST} {{}}\n"
+_CHECKLIST_SAVED = f"   - {_C_GREEN}Checklist Saved:{_RST} See `{{}}`\n"
+
+_ACTION_HDR = f"{_C_CYAN}### {{}} {{}}{_RST}\nBased on NIST 800-53 Rev 5 and available STIGs:\n\n"
+_ANSWERING_HDR = f"{_C_YELLOW}**Answering:** '{{}}'{_RST}\nHere’s what I found based on NIST 800-53 and available STIGs:\n\n"
+_NO_CONTROLS = f"{_C_RED}**No NIST controls detected.**{_RST} Try including a control ID like 'AU-3'.\n"
+
+# Lookup branch headers
+_CCI_LOOKUP_HDR = f"{_C_CYAN}CCI Lookup:{_RST}\n"
+_CCI_MAPPINGS_HDR = f"{_C_CYAN}CCI Mappings for {{}}:{_RST}\n"
+_CCI_SUMMARY_HDR = f"{_C_CYAN}CCI-to-NIST Mappings Summary:{_RST}\n"
+_CCI_SUBPART_NOTE = f"{_C_YELLOW}Note:{_RST} Subparts (e.g., 'A', '1 (A)') refer to specific NIST 800-53 requirements or enhancements.\n"
+
+# Control summary ("what is") sections
+_ENTAIL_HDR = f"\n{_C_CYAN}#### What Does {{}} Entail?{_RST}\n{{}}\n"
+_PARAMETERS_LINE = f"\n{_C_YELLOW}**Parameters:**{_RST} {{}}\n"
+_RELATED_LINE = f"\n{_C_YELLOW}**Related Controls:**{_RST} {{}}\n"
+
+_STIG_LIST_HDR = f"{_C_CYAN}### Available STIGs{_RST}\n"
+# One "list stigs" entry: number, technology, version, title, file
+_STIG_LIST_ENTRY = f"{_C_YELLOW}%d. %s (Version %s){_RST}\n   - Title: %s\n   - File: %s\n\n"
+_STIG_LIST_TIP = f"{_C_GREEN}Tip:{_RST} Use 'assess <control>' or 'implement <control>' to see STIG recommendations.\n"
+
+# Technology selection prompt: entry is number, technology, version, title
+_SELECT_TECH_HDR = f"{_C_CYAN}### Select a Technology{_RST}\n"
+_SELECT_TECH_ENTRY = f"{_C_YELLOW}%d. %s (Version %s){_RST}\n   - Title: %s\n"
+_SELECT_TECH_NEXT = f"\n{_C_GREEN}Next Step:{_RST} Enter a number (1-{{}}, or 0 for all) to proceed.\n"
+
+@lru_cache(maxsize=16)
+def _severity_label(severity):
+    """Colored 'Severity: X' label; there are only a handful of distinct severities."""
+    # Parsed recommendations are already capitalized; this covers any other source
+    severity = severity.capitalize()
+    color = severity_colors.get(severity, _C_WHITE)
+    return f"{color}Severity: {severity}{_RST}"
+
+# Query patterns, compiled once at import
+_CCI_RE = re.compile(r"(cci-\d+)")
+_REVERSE_CCI_RE = re.compile(r"(?:list|show)?\s*cci\s*mappings\s*for\s*(\w{2}-\d+(?:\s*[a-z])?(?:\([a-z0-9]+\))?)")
+_WHAT_IS_RE = re.compile(r"what is\s+(\w{2}-\d+(?:\(\d+\))?)\s*\?")
+_INCORPORATED_RE = re.compile(r"Incorporated into (\w{2}-\d+(?:\(\d+\))?)", re.IGNORECASE)
+_TECH_IDX_RE = re.compile(r'with technology index\s*(\d+)')
+_TECH_HINT_RE = re.compile(r'\bon\s+([a-zA-Z0-9][a-zA-Z0-9\s\-]*[a-zA-Z0-9])\b', re.IGNORECASE)
+# NIST control IDs such as AU-3 or AC-2(1); matches are upper-cased by the caller
+_CONTROL_RE = re.compile(r'\b[A-Z]{2}-[0-9]{1,2}(?:\([A-Z0-9]+\))?\b', re.IGNORECASE)
+
+# STIG fix text: a line starting with "<digit>." begins a new step; other line breaks are wrapping
+_FIX_STEP_RE = re.compile(r'^(?=\s*\d\.)', re.MULTILINE)
+_LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+
+# Boilerplate stripped from NIST steps when they become checklist tasks
+_TASK_NOISE_RE = re.compile(r"to assess this control, verify |check parameters: none specified")
+_ASSIGNMENT_RE = re.compile(r"\[withdrawn: incorporated into ac-6\.\]|\[assignment: organization-defined |\]")
+
+# Intent keywords are matched as substrings (so "assessment" counts as "assess"),
+# collected in a single scan of the query.
+_INTENT_RE = re.compile(r"list stigs|assess|audit|implement")
+_ASSESS_WORDS = frozenset({"assess", "audit"})
+
 def get_technology_name(stig):
     title = stig.get('title', 'Untitled')
-    tech = stig.get('technology', title)
-    if "STIG" in title and title != "Untitled STIG" and len(title.split()) > 2:
-        return " ".join(word for word in title.split() if "STIG" not in word and "V" not in word and "R" not in word[:2])
+    return _technology_name(title, stig.get('technology', title))
+
+@lru_cache(maxsize=4096)
+def _technology_name(title, tech):
+    if "STIG" in title and title != "Untitled STIG":
+        words = title.split()
+        if len(words) > 2:
+            # find() with bounds checks the first two characters for "R" without slicing
+            return " ".join([word for word in words if "STIG" not in word and "V" not in word and word.find("R", 0, 2) < 0])
     return tech
 
-def save_checklist(control_id, steps, stig_recommendations, filename_prefix="checklist"):
-    checklist_dir = "assessment_checklists"
-    os.makedirs(checklist_dir, exist_ok=True)
-    filename = os.path.join(checklist_dir, f"{filename_prefix}_{control_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
-    with open(filename, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(["Source", "Control/Rule", "Action", "Assessment Task", "Severity", "Expected Evidence", "Status"])
-        
-        # NIST steps
-        for i, step in enumerate(steps, 1):
-            task = step.lower().replace("to assess this control, verify ", "").replace("check parameters: none specified", "").strip()
-            if "[assignment:" in task:
-                task = task.replace("[assignment: organization-defined ", "").replace("]", "").replace("[withdrawn: incorporated into ac-6.]", "Withdrawn (see AC-6)")
-                task = f"Verify {task} as defined by your organization."
-            else:
-                task = f"Verify {task.capitalize()}."
-            writer.writerow([
-                "NIST 800-53",
-                control_id,
-                f"Verify Compliance ({i})",
-                task,
-                "N/A",
-                "Access control policy, logs, or config screenshots",
-                "Pending"
-            ])
-        
-        # STIG recommendations
-        for tech, recs in stig_recommendations.items():
-            for matched_control, rec_list in recs.items():
-                for rec in rec_list:
-                    fix_lines = rec['fix'].split('\n')
-                    formatted_fix = []
-                    for line in fix_lines:
-                        line = line.strip()
-                        if line and line[0].isdigit() and line[1] == '.':
-                            formatted_fix.append(f"- {line}")
-                        elif line and formatted_fix:
-                            formatted_fix[-1] += f" {line}"
-                        elif line:
-                            formatted_fix.append(f"- {line}")
-                    task = f"Verify {rec['title']}:\n" + "\n".join(formatted_fix)
-                    writer.writerow([
-                        f"STIG {tech}",
-                        rec['rule_id'],
-                        "Configure and Verify",
-                        task,
-                        rec.get('severity', 'medium').capitalize(),
-                        "Configuration settings, logs, or admin console screenshots",
-                        "Pending"
-                    ])
+def build_stig_index(available_stigs, all_stig_recommendations):
+    """
+    Build the technology lookups generate_response needs, once per STIG load.
+
+    Args:
+        available_stigs (list): STIG metadata dicts as returned by load_stig_data.
+        all_stig_recommendations (dict): Recommendations keyed by technology, then control ID.
+
+    Returns:
+        dict: A dictionary with:
+            - 'tech_to_stig': lowercase technology name -> STIG metadata dict.
+            - 'all_techs': sorted tuple of the lowercase technology names.
+            - 'control_to_techs': control ID -> list of lowercase technology names with recommendations for it.
+
+    Example:
+        >>> stig_index = build_stig_index(available_stigs, all_stig_recommendations)
+        >>> print(stig_index['control_to_techs'].get('AU-3'))
+        ['windows 10', 'red hat 9']
+    """
+    tech_to_stig = {get_technology_name(stig).lower(): stig for stig in available_stigs}  # Normalize to lowercase for matching
+    control_to_techs = {}
+    for tech, stig in tech_to_stig.items():
+        for control_id in all_stig_recommendations.get(stig['technology'], ()):
+            control_to_techs.setdefault(control_id, []).append(tech)
+    return {
+        'tech_to_stig': tech_to_stig,
+        'all_techs': tuple(sorted(tech_to_stig)),
+        'control_to_techs': control_to_techs,
+    }
+
+def _assignment_replacement(match):
+    return "Withdrawn (see AC-6)" if match.group().startswith("[withdrawn") else ""
+
+def _format_fix_steps(fix):
+    """Turn STIG fix text into '- ' bullets, one per numbered step, with wrapped lines joined."""
+    parts = map(str.strip, _FIX_STEP_RE.split(fix))
+    return "\n".join([f"- {_LINE_BREAK_RE.sub(' ', part)}" for part in parts if part])
+
+def _iter_stig_recs(stig_recommendations):
+    """Yield (technology, control ID, recommendation) for every entry of a tech -> control -> recs mapping."""
+    for tech, recs in stig_recommendations.items():
+        for control_id, rec_list in recs.items():
+            for rec in rec_list:
+                yield tech, control_id, rec
+
+def _nist_rows(control_id, steps):
+    """Yield one checklist row per NIST assessment step."""
+    for i, step in enumerate(steps, 1):
+        task = _TASK_NOISE_RE.sub("", step.lower()).strip()
+        if "[assignment:" in task:
+            task = _ASSIGNMENT_RE.sub(_assignment_replacement, task)
+            task = f"Verify {task} as defined by your organization."
+        else:
+            task = f"Verify {task.capitalize()}."
+        yield [
+            "NIST 800-53",
+            control_id,
+            f"Verify Compliance ({i})",
+            task,
+            "N/A",
+            "Access control policy, logs, or config screenshots",
+            "Pending"
+        ]
+
+def _stig_rows(stig_recommendations):
+    """Yield one checklist row per STIG recommendation."""
+    for tech, _, rec in _iter_stig_recs(stig_recommendations):
+        yield [
+            f"STIG {tech}",
+            rec['rule_id'],
+            "Configure and Verify",
+            f"Verify {rec['title']}:\n{_format_fix_steps(rec['fix'])}",
+            rec.get('severity', 'Medium'),
+            "Configuration settings, logs, or admin console screenshots",
+            "Pending"
+        ]
+
+def _assessment_steps(ctrl, assess_docs):
+    """NIST steps for assessing a control: its retrieved assessment docs, else steps inferred from its description."""
+    return assess_docs or extract_actionable_steps(ctrl['description'])
+
+def _open_checklist(filename):
+    try:
+        return open(filename, 'w', newline='', encoding='utf-8', buffering=CHECKLIST_BUFFER_SIZE)
+    except FileNotFoundError:
+        # Only pay for makedirs the first time (or if the directory was removed)
+        os.makedirs(CHECKLIST_DIR, exist_ok=True)
+        return open(filename, 'w', newline='', encoding='utf-8', buffering=CHECKLIST_BUFFER_SIZE)
+
+def save_checklist(control_id, steps, stig_recommendations, filename_prefix="checklist", timestamp=None):
+    if not steps and next(_iter_stig_recs(stig_recommendations), None) is None:
+        logging.debug("Skipping empty checklist for %s", control_id)
+        return None
+    timestamp = timestamp or time.strftime('%Y%m%d_%H%M%S')
+    filename = os.path.join(CHECKLIST_DIR, f"{filename_prefix}_{control_id}_{timestamp}.csv")
+    rows = chain((_CHECKLIST_HEADER,), _nist_rows(control_id, steps), _stig_rows(stig_recommendations))
+    buf = io.StringIO(newline='')
+    writer = csv.writer(buf)
+    with _open_checklist(filename) as f:
+        # Format rows in batches and hand each batch to the file as a single write
+        while True:
+            writer.writerows(islice(rows, CHECKLIST_BATCH_ROWS))
+            chunk = buf.getvalue()
+            if not chunk:
+                break
+            f.write(chunk)
+            buf.seek(0)
+            buf.truncate()
     logging.info(f"Generated checklist: {filename}")
     return filename
 
-def generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=False):
+def generate_response(query, retrieved_docs, control_details, high_baseline_controls, all_stig_recommendations, available_stigs, assessment_procedures, cci_to_nist, generate_checklist=False, nist_to_ccis=None, stig_index=None):
     query_lower = query.lower()
-    response = []
+    buf = io.StringIO()
+    write = buf.write
 
-    # CCI-specific query handling (unchanged)
-    cci_match = re.search(r"(cci-\d+)", query_lower)
+    # Lookup branches run in a fixed order; each regex only runs when a keyword it requires is present
+    # CCI-specific query handling
+    cci_match = _CCI_RE.search(query_lower) if "cci-" in query_lower else None
     if cci_match:
         cci_id = cci_match.group(1).upper()
         nist_control = cci_to_nist.get(cci_id, "Not mapped to NIST 800-53 Rev 5")
         normalized_control = normalize_control_id(nist_control)
-        response.append(f"{Fore.CYAN}CCI Lookup:{Style.RESET_ALL}")
-        response.append(f"- {cci_id} maps to NIST {normalized_control}")
+        write(_CCI_LOOKUP_HDR)
+        write(f"- {cci_id} maps to NIST {normalized_control}\n")
         if normalized_control in control_details:
             ctrl = control_details[normalized_control]
-            response.append(f"- **Title:** {ctrl['title']}")
-            response.append(f"- **Description:** {ctrl['description']}")
-        return "\n".join(response)
+            write(f"- **Title:** {ctrl['title']}\n")
+            write(f"- **Description:** {ctrl['description']}\n")
+        return buf.getvalue().removesuffix("\n")
 
-    reverse_match = re.search(r"(?:list|show)?\s*cci\s*mappings\s*for\s*(\w{2}-\d+(?:\s*[a-z])?(?:\([a-z0-9]+\))?)", query_lower)
+    reverse_match = _REVERSE_CCI_RE.search(query_lower) if "mappings" in query_lower else None
     if reverse_match:
         control_id = normalize_control_id(reverse_match.group(1).upper())
-        matching_ccis = [cci for cci, nist in cci_to_nist.items() if normalize_control_id(nist) == control_id]
-        response.append(f"{Fore.CYAN}CCI Mappings for {control_id}:{Style.RESET_ALL}")
+        if nist_to_ccis is None:
+            nist_to_ccis = build_nist_to_ccis(cci_to_nist)
+        matching_ccis = nist_to_ccis.get(control_id, ())
+        write(_CCI_MAPPINGS_HDR.format(control_id))
         if matching_ccis:
             for cci in matching_ccis:
-                response.append(f"- {cci} -> {control_id}")
+                write(f"- {cci} -> {control_id}\n")
             if control_id in control_details:
                 ctrl = control_details[control_id]
-                response.append(f"\n- **Title:** {ctrl['title']}")
-                response.append(f"- **Description:** {ctrl['description']}")
+                write(f"\n- **Title:** {ctrl['title']}\n")
+                write(f"- **Description:** {ctrl['description']}\n")
         else:
-            response.append(f"- No CCI mappings found for {control_id}.")
-        return "\n".join(response)
+            write(f"- No CCI mappings found for {control_id}.\n")
+        return buf.getvalue().removesuffix("\n")
 
     if "show cci mappings" in query_lower and not reverse_match:
-        response.append(f"{Fore.CYAN}CCI-to-NIST Mappings Summary:{Style.RESET_ALL}")
-        response.append(f"- Total mappings: {len(cci_to_nist)}")
-        response.append("- Sample mappings (first 5):")
+        write(_CCI_SUMMARY_HDR)
+        write(f"- Total mappings: {len(cci_to_nist)}\n")
+        write("- Sample mappings (first 5):\n")
         for cci, nist in list(cci_to_nist.items())[:5]:
-            response.append(f"  - {cci} -> {nist}")
+            write(f"  - {cci} -> {nist}\n")
         if len(cci_to_nist) > 5:
-            response.append(f"- ...and {len(cci_to_nist) - 5} more.")
-        response.append(f"{Fore.YELLOW}Note:{Style.RESET_ALL} Subparts (e.g., 'A', '1 (A)') refer to specific NIST 800-53 requirements or enhancements.")
-        return "\n".join(response)
+            write(f"- ...and {len(cci_to_nist) - 5} more.\n")
+        write(_CCI_SUBPART_NOTE)
+        return buf.getvalue().removesuffix("\n")
 
-    control_summary_match = re.search(r"what is\s+(\w{2}-\d+(?:\(\d+\))?)\s*\?", query_lower)
+    control_summary_match = _WHAT_IS_RE.search(query_lower) if "what is" in query_lower else None
     if control_summary_match:
         control_id = control_summary_match.group(1).upper()
         if control_id in control_details:
             ctrl = control_details[control_id]
             description = ctrl['description']
             if "[withdrawn:" in description.lower():
-                match = re.search(r"Incorporated into (\w{2}-\d+(?:\(\d+\))?)", description, re.IGNORECASE)
+                match = _INCORPORATED_RE.search(description)
                 if match:
                     incorporated_into = match.group(1).upper()
-                    response.append(f"{control_id} has been withdrawn and incorporated into {incorporated_into}.")
+                    write(f"{control_id} has been withdrawn and incorporated into {incorporated_into}.\n")
                 else:
-                    response.append(f"{control_id} has been withdrawn.")
+                    write(f"{control_id} has been withdrawn.\n")
             else:
                 first_sentence = description.split('.')[0]
                 family = control_id.split('-')[0]
@@ -163,97 +322,95 @@ def generate_response(query, retrieved_docs, control_details, high_baseline_cont
                     f"This control requires organizations to {first_sentence.lower()}. "
                     f"Essentially, this control helps organizations {purpose}."
                 )
-                response.append(summary)
-                response.append(f"\n{Fore.CYAN}#### What Does {control_id} Entail?{Style.RESET_ALL}\n{description}")
+                write(f"{summary}\n")
+                write(_ENTAIL_HDR.format(control_id, description))
                 if ctrl.get('parameters'):
-                    response.append(f"\n{Fore.YELLOW}**Parameters:**{Style.RESET_ALL} {', '.join(ctrl['parameters'])}")
+                    write(_PARAMETERS_LINE.format(ctrl['parameters_text']))
                 if ctrl.get('related_controls'):
-                    response.append(f"\n{Fore.YELLOW}**Related Controls:**{Style.RESET_ALL} {', '.join(ctrl['related_controls'])}")
+                    write(_RELATED_LINE.format(ctrl['related_controls_text']))
         else:
-            response.append(f"Control {control_id} not found in the NIST 800-53 Revision 5 catalog.")
-        return "\n".join(response)
+            write(f"Control {control_id} not found in the NIST 800-53 Revision 5 catalog.\n")
+        return buf.getvalue().removesuffix("\n")
 
-    if "list stigs" in query_lower:
+    intents = set(_INTENT_RE.findall(query_lower))
+
+    if "list stigs" in intents:
+        # keyword comes from query_lower, so only the STIG fields need lowercasing
         keyword = query_lower.split("for")[1].strip() if "for" in query_lower else None
         filtered_stigs = [
             stig for stig in available_stigs 
-            if not keyword or keyword.lower() in stig['technology'].lower() or keyword.lower() in stig['title'].lower()
+            if not keyword or keyword in stig['technology'].lower() or keyword in stig['title'].lower()
         ]
         if not filtered_stigs:
             return f"No STIGs found{' for ' + keyword if keyword else ''}. Please check the `stig_folder` in `config.ini`."
         
-        response.append(f"{Fore.CYAN}### Available STIGs{Style.RESET_ALL}")
-        response.append(f"Here’s a list of {len(filtered_stigs)} STIG(s) loaded in the system:\n")
+        write(_STIG_LIST_HDR)
+        write(f"Here’s a list of {len(filtered_stigs)} STIG(s) loaded in the system:\n\n")
         for i, stig in enumerate(filtered_stigs, 1):
-            tech = stig['technology']
-            version = stig['version']
-            title = stig['title']
-            file = stig['file']
-            response.append(f"{Fore.YELLOW}{i}. {tech} (Version {version}){Style.RESET_ALL}")
-            response.append(f"   - Title: {title}")
-            response.append(f"   - File: {file}")
-            response.append("")
-        response.append(f"{Fore.GREEN}Tip:{Style.RESET_ALL} Use 'assess <control>' or 'implement <control>' to see STIG recommendations.")
-        return "\n".join(response)
-
-    control_pattern = re.compile(r'\b([A-Z]{2}-[0-9]{1,2}(?:\s*\([a-zA-Z0-9]+\))?)\b')
-    control_ids = [match.replace(' ', '') for match in control_pattern.findall(query.upper())]
-    system_match = re.search(r'with technology index\s*(\d+)', query_lower)
-    selected_idx = int(system_match.group(1)) if system_match else None
+            write(_STIG_LIST_ENTRY % (i, stig['technology'], stig['version'], stig['title'], stig['file']))
+        write(_STIG_LIST_TIP)
+        return buf.getvalue().removesuffix("\n")
+
+    # Every control ID contains a hyphen, so skip the regex scan entirely when there is none.
+    # Deduplicate while keeping the order the user mentioned the controls in.
+    control_ids = []
+    if '-' in query:
+        control_ids = list(dict.fromkeys(match.upper() for match in _CONTROL_RE.findall(query)))
 
     if not control_ids:
-        response.append(f"{Fore.RED}**No NIST controls detected.**{Style.RESET_ALL} Try including a control ID like 'AU-3'.")
-        return "\n\n".join(response)
+        write(_NO_CONTROLS)
+        return buf.getvalue().removesuffix("\n")
 
-    is_assessment_query = "assess" in query_lower or "audit" in query_lower
-    is_implement_query = "implement" in query_lower
+    system_match = _TECH_IDX_RE.search(query_lower) if "technology index" in query_lower else None
+    selected_idx = int(system_match.group(1)) if system_match else None
+
+    is_assessment_query = not intents.isdisjoint(_ASSESS_WORDS)
+    is_implement_query = "implement" in intents
 
     if not (is_assessment_query or is_implement_query):
-        response.append(f"{Fore.YELLOW}**Answering:** '{query}'{Style.RESET_ALL}")
-        response.append(f"Here’s what I found based on NIST 800-53 and available STIGs:\n")
-        response.append("Relevant info: " + "\n".join(retrieved_docs[:5]))
-        return "\n".join(response)
+        write(_ANSWERING_HDR.format(query))
+        write("Relevant info: " + "\n".join(retrieved_docs[:5]) + "\n")
+        return buf.getvalue().removesuffix("\n")
 
     tech_hint = None
-    tech_match = re.search(r'on\s+([a-zA-Z0-9][a-zA-Z0-9\s\-]*[a-zA-Z0-9])\b', query_lower, re.IGNORECASE)
+    tech_match = _TECH_HINT_RE.search(query_lower) if "on" in query_lower else None
     if tech_match:
-        tech_hint = tech_match.group(1).strip().lower()
-        logging.debug(f"Detected tech hint: {tech_hint}")
-
-    tech_to_stig = {get_technology_name(stig).lower(): stig for stig in available_stigs}  # Normalize to lowercase for matching
-    all_techs = sorted(set(tech_to_stig.keys()))
-    applicable_techs = []
-    for tech, stig in tech_to_stig.items():
-        for control_id in control_ids:
-            if control_id in all_stig_recommendations.get(stig['technology'], {}):
-                applicable_techs.append(tech)
-                logging.debug(f"Found STIG match: {tech} for control {control_id}")
-                break
+        tech_hint = tech_match.group(1).strip()
+        logging.debug("Detected tech hint: %s", tech_hint)
+
+    if stig_index is None:
+        stig_index = build_stig_index(available_stigs, all_stig_recommendations)
+    tech_to_stig = stig_index['tech_to_stig']
+    all_techs = stig_index['all_techs']
+    control_to_techs = stig_index['control_to_techs']
+    applicable_techs = list(dict.fromkeys(
+        tech for control_id in control_ids for tech in control_to_techs.get(control_id, ())
+    ))
 
     unique_techs = sorted(set(applicable_techs))
-    logging.debug(f"Applicable technologies before filtering: {unique_techs}")
+    logging.debug("Applicable technologies before filtering: %s", unique_techs)
 
     if tech_hint:
-        matching_techs = [t for t in all_techs if tech_hint.lower() in t.lower()]
+        # all_techs and tech_hint are both lowercase already
+        matching_techs = [t for t in all_techs if tech_hint in t]
         if matching_techs:
-            unique_techs = sorted(set(matching_techs) & set(applicable_techs)) or matching_techs
-            logging.debug(f"Filtered to technologies matching '{tech_hint}': {unique_techs}")
+            unique_techs = sorted(set(applicable_techs).intersection(matching_techs)) or matching_techs
+            logging.debug("Filtered to technologies matching '%s': %s", tech_hint, unique_techs)
         else:
-            logging.debug(f"No match for '{tech_hint}', using applicable techs")
+            logging.debug("No match for '%s', using applicable techs", tech_hint)
 
     if not unique_techs and applicable_techs:
         unique_techs = applicable_techs
-        logging.debug(f"Fallback to applicable techs: {unique_techs}")
+        logging.debug("Fallback to applicable techs: %s", unique_techs)
 
     if selected_idx is None and len(unique_techs) > 1:
-        response.append(f"{Fore.CYAN}### Select a Technology{Style.RESET_ALL}")
-        response.append(f"Multiple technologies support {', '.join(control_ids)}. Please choose one:\n")
+        write(_SELECT_TECH_HDR)
+        write(f"Multiple technologies support {', '.join(control_ids)}. Please choose one:\n\n")
         for i, tech in enumerate(unique_techs, 1):
             stig = tech_to_stig[tech]
-            response.append(f"{Fore.YELLOW}{i}. {stig['technology']} (Version {stig['version']}){Style.RESET_ALL}")
-            response.append(f"   - Title: {stig['title']}")
-        response.append(f"\n{Fore.GREEN}Next Step:{Style.RESET_ALL} Enter a number (1-{len(unique_techs)}, or 0 for all) to proceed.")
-        return "\n".join(response) + "\nCLARIFICATION_NEEDED"
+            write(_SELECT_TECH_ENTRY % (i, stig['technology'], stig['version'], stig['title']))
+        write(_SELECT_TECH_NEXT.format(len(unique_techs)))
+        return buf.getvalue() + "CLARIFICATION_NEEDED"
 
     if selected_idx == 0:
         selected_techs = [tech_to_stig[t]['technology'] for t in unique_techs]
@@ -266,92 +423,92 @@ def generate_response(query, retrieved_docs, control_details, high_baseline_cont
     else:
         return "Invalid technology selection."
 
-    logging.debug(f"Selected technologies: {selected_techs}")
+    logging.debug("Selected technologies: %s", selected_techs)
 
     action = "Assessing" if is_assessment_query else "Implementing"
-    response.append(f"{Fore.CYAN}### {action} {', '.join(control_ids)}{Style.RESET_ALL}")
-    response.append(f"Based on NIST 800-53 Rev 5 and available STIGs:\n")
+    write(_ACTION_HDR.format(action, ', '.join(control_ids)))
+
+    # Index retrieved docs by the control in their "<source>, <control ID>: " tag in one pass
+    assess_by_ctrl = defaultdict(list)
+    impl_by_ctrl = defaultdict(list)
+    for doc in retrieved_docs:
+        tag, sep, payload = doc.partition(': ')
+        if not sep:
+            continue
+        source, _, cid = tag.rpartition(', ')
+        (assess_by_ctrl if "Assessment" in source else impl_by_ctrl)[cid].append(payload)
+
+    # Checklists saved for this query share one timestamp
+    checklist_timestamp = time.strftime('%Y%m%d_%H%M%S') if generate_checklist and is_assessment_query else None
 
     for control_id in control_ids:
         if control_id not in control_details:
-            response.append(f"{Fore.YELLOW}1. {control_id}{Style.RESET_ALL}")
-            response.append(f"   - Status: Not found in NIST 800-53 Rev 5 catalog.")
-            response.append("")
+            write(_UNKNOWN_CONTROL_HDR.format(control_id))
+            write("   - Status: Not found in NIST 800-53 Rev 5 catalog.\n\n")
             continue
 
         ctrl = control_details[control_id]
-        response.append(f"{Fore.YELLOW}1. {control_id} - {ctrl['title']}{Style.RESET_ALL}")
-        response.append(f"   - Purpose: {ctrl['description'].split('.')[0].lower()}.")
-        response.append("")
+        # Each selected technology's recommendations for this control, looked up once
+        recs_by_tech = {tech: all_stig_recommendations.get(tech, _EMPTY).get(control_id, ()) for tech in selected_techs}
+        write(_CONTROL_HDR.format(control_id, ctrl['title']))
+        write(f"   - Purpose: {ctrl['description'].split('.')[0].lower()}.\n\n")
 
         if is_assessment_query:
-            response.append(f"{Fore.CYAN}   Steps to Assess:{Style.RESET_ALL}")
+            # NIST steps for this control, computed once and reused by the checklist below
+            steps = None
+            write(_ASSESS_HDR)
             if control_id in assessment_procedures:
                 for i, method in enumerate(assessment_procedures[control_id], 1):
-                    response.append(f"     {i}. {method}")
+                    write(f"     {i}. {method}\n")
             else:
-                assess_docs = [doc.split(': ', 1)[1] for doc in retrieved_docs if f"Assessment, {control_id}" in doc]
-                steps = assess_docs if assess_docs else extract_actionable_steps(ctrl['description'])
+                steps = _assessment_steps(ctrl, assess_by_ctrl.get(control_id))
                 for i, step in enumerate(steps, 1):
-                    response.append(f"     {i}. {step}")
+                    write(f"     {i}. {step}\n")
                 if ctrl.get('parameters'):
-                    response.append(f"     {len(steps) + 1}. Confirm parameters: {', '.join(ctrl['parameters'])}")
-            response.append("")
-
-            if selected_techs:
-                for tech in selected_techs:
-                    recs = all_stig_recommendations.get(tech, {}).get(control_id, [])
-                    if recs:
-                        response.append(f"{Fore.CYAN}   STIG Checks for {tech}:{Style.RESET_ALL}")
-                        for i, rec in enumerate(recs, 1):
-                            severity = rec.get('severity', 'medium').capitalize()
-                            color = severity_colors.get(severity, Fore.WHITE)
-                            response.append(f"     {i}. {rec['title']} (Rule {rec['rule_id']})")
-                            response.append(f"        - {Fore.GREEN}Verify:{Style.RESET_ALL} {rec['fix']}")
-                            response.append(f"        - {color}Severity: {severity}{Style.RESET_ALL}")
-                        response.append("")
-                    else:
-                        response.append(f"{Fore.CYAN}   STIG Checks for {tech}:{Style.RESET_ALL}")
-                        response.append(f"     1. No specific STIG checks available.")
-                        response.append("")
+                    write(f"     {len(steps) + 1}. Confirm parameters: {ctrl['parameters_text']}\n")
+            write("\n")
+
+            for tech, recs in recs_by_tech.items():
+                if recs:
+                    write(_STIG_CHECKS_HDR.format(tech))
+                    for i, rec in enumerate(recs, 1):
+                        write(f"     {i}. {rec['title']} (Rule {rec['rule_id']})\n")
+                        write(_VERIFY_LINE.format(rec['fix']))
+                        write(f"        - {_severity_label(rec.get('severity', 'Medium'))}\n")
+                    write("\n")
+                else:
+                    write(_STIG_CHECKS_HDR.format(tech))
+                    write("     1. No specific STIG checks available.\n\n")
 
             if generate_checklist:
-                steps = assess_docs if 'assess_docs' in locals() else extract_actionable_steps(ctrl['description'])
-                stig_recs_for_checklist = {
-                    tech: {control_id: all_stig_recommendations.get(tech, {}).get(control_id, [])}
-                    for tech in selected_techs if all_stig_recommendations.get(tech, {}).get(control_id)
-                }
-                if steps or stig_recs_for_checklist:
-                    checklist_file = save_checklist(control_id, steps, stig_recs_for_checklist)
-                    response.append(f"   - {Fore.GREEN}Checklist Saved:{Style.RESET_ALL} See `{checklist_file}`")
-                    response.append("")
+                if steps is None:
+                    steps = _assessment_steps(ctrl, assess_by_ctrl.get(control_id))
+                stig_recs_for_checklist = {tech: {control_id: recs} for tech, recs in recs_by_tech.items() if recs}
+                checklist_file = save_checklist(control_id, steps, stig_recs_for_checklist, timestamp=checklist_timestamp)
+                if checklist_file:
+                    write(_CHECKLIST_SAVED.format(checklist_file))
+                    write("\n")
 
         elif is_implement_query:
-            response.append(f"{Fore.CYAN}   How to Implement:{Style.RESET_ALL}")
-            guidance = [doc.split(': ', 1)[1] for doc in retrieved_docs if control_id in doc and "Assessment" not in doc]
+            write(_IMPLEMENT_HDR)
+            guidance = impl_by_ctrl.get(control_id, ())
             if guidance:
                 for i, step in enumerate(guidance, 1):
-                    response.append(f"     {i}. {step}")
+                    write(f"     {i}. {step}\n")
             else:
-                response.append(f"     1. Follow the control description to enforce this requirement.")
-            response.append("")
-
-            if selected_techs:
-                for tech in selected_techs:
-                    recs = all_stig_recommendations.get(tech, {}).get(control_id, [])
-                    if recs:
-                        response.append(f"{Fore.CYAN}   STIG Guidance for {tech}:{Style.RESET_ALL}")
-                        for i, rec in enumerate(recs, 1):
-                            short_title = rec['title'][:50] + "..." if len(rec['title']) > 50 else rec['title']
-                            response.append(f"     {i}. {short_title} (Rule {rec['rule_id']})")
-                            response.append(f"        - {Fore.GREEN}Apply:{Style.RESET_ALL} {rec['fix']}")
-                        response.append("")
-                    else:
-                        response.append(f"{Fore.CYAN}   STIG Guidance for {tech}:{Style.RESET_ALL}")
-                        response.append(f"     1. No specific STIG guidance available.")
-                        response.append("")
-
-    if len(response) <= 2:
-        response.append(f"{Fore.RED}No specific information found for this query.{Style.RESET_ALL}")
-
-    return "\n".join(response)
+                write("     1. Follow the control description to enforce this requirement.\n")
+            write("\n")
+
+            for tech, recs in recs_by_tech.items():
+                if recs:
+                    write(_STIG_GUIDANCE_HDR.format(tech))
+                    for i, rec in enumerate(recs, 1):
+                        short_title = rec['title'][:50] + "..." if len(rec['title']) > 50 else rec['title']
+                        write(f"     {i}. {short_title} (Rule {rec['rule_id']})\n")
+                        write(_APPLY_LINE.format(rec['fix']))
+                    write("\n")
+                else:
+                    write(_STIG_GUIDANCE_HDR.format(tech))
+                    write("     1. No specific STIG guidance available.\n\n")
+
+    return buf.getvalue().removesuffix("\n")
@@ -1,37 +1,35 @@
-import spacy
+import re
+from functools import lru_cache
 
-nlp = spacy.load('en_core_web_sm')
+# Words that must not start or end a step's target, so "review and update" or "integrity of" never become steps
+_FUNCTION_WORDS = r'(?!(?:and|or|of|to|for|is|are|be|by|in|on|with|as|at|from|that|the|a|an|all|any|each)\b)'
+# An action verb followed by the (one- or two-word) thing it acts on, skipping a coordinated
+# verb ("review and update"), up to two leading determiners or "that", and any function words
+_ACTION_RE = re.compile(
+    r'\b(verify|ensure|check|review|confirm|examine)'
+    r'(?:\s+(?:and|or)\s+[a-z]+)?'
+    r'\s+(?:(?:the|a|an|that|all|any|each)\s+){0,2}'
+    rf'({_FUNCTION_WORDS}[a-z]+(?:\s+{_FUNCTION_WORDS}[a-z]+)?)'
+)
 
+@lru_cache(maxsize=1024)
 def extract_actionable_steps(description):
     """
-    Extract actionable steps from a control description using spaCy.
+    Extract actionable steps from a control description.
+
+    Results are memoized per description and returned as a tuple so the cached value stays immutable.
 
     Args:
         description (str): The control description to analyze.
 
     Returns:
-        list: A list of actionable steps (e.g., 'verify access control', 'check encryption').
+        tuple: Actionable steps (e.g., 'verify access control', 'check encryption').
 
     Example:
         >>> steps = extract_actionable_steps('Ensure that access control is enforced.')
         >>> print(steps)
-        ['ensure access control']
+        ('ensure access control',)
     """
-    doc = nlp(description.lower())
-    steps = []
-    action_verbs = {'verify', 'ensure', 'check', 'review', 'confirm', 'examine'}
-    
-    for token in doc:
-        if token.text in action_verbs and token.pos_ == 'VERB':
-            for child in token.children:
-                if child.dep_ in ('dobj', 'attr', 'prep') or child.pos_ in ('NOUN', 'PROPN'):
-                    steps.append(f"{token.text} {child.text}")
-                    break
-            else:
-                for next_token in doc[token.i + 1:]:
-                    if next_token.pos_ in ('NOUN', 'PROPN'):
-                        steps.append(f"{token.text} {next_token.text}")
-                        break
-                    elif next_token.text == '.':
-                        break
-    return steps if steps else [f"verify {doc.text.split('.')[0]}"]
+    description = description.lower()
+    steps = tuple(f"{verb} {target}" for verb, target in _ACTION_RE.findall(description))
+    return steps if steps else (f"verify {description.split('.')[0]}",)
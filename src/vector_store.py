@@ -5,8 +5,28 @@ import logging
 from sentence_transformers import SentenceTransformer
 import faiss
 import re
+from functools import lru_cache
 from .parsers import normalize_control_id
 
+# NIST control IDs such as AC-2 or AC-2(1), anchored so "800-53" or "CCI-000130" yield nothing.
+# The end uses (?!\w) rather than \b, which would drop an enhancement followed by a space.
+_CONTROL_ID_RE = re.compile(r'\b([A-Z]{2}-\d+(?:\([A-Z0-9]+\))?)(?!\w)', re.IGNORECASE)
+
+# HNSW graph parameters: neighbors per node, build-time and query-time candidate list sizes.
+# FAISS searches with max(efSearch, k), so HNSW_EF_SEARCH only matters while it exceeds the
+# default top_k of 100 used by retrieve_documents.
+# Embeddings are L2-normalized, so inner product ranks by cosine similarity, and stored as
+# FP16, which halves index memory with no meaningful loss for unit vectors.
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+
+# Number of recent query embeddings kept, so repeated queries in a session skip the model
+QUERY_EMBEDDING_CACHE_SIZE = 512
+
+# Bumped whenever the pickled documents or their control ID sets change shape or content
+DOCS_CACHE_VERSION = 2
+
 def build_vector_store(documents, model_name, knowledge_dir):
     """
     Build or load a FAISS vector store from a list of documents.
@@ -17,34 +37,47 @@ def build_vector_store(documents, model_name, knowledge_dir):
         knowledge_dir (str): Directory to save or load the FAISS index.
 
     Returns:
-        tuple: (model, index, doc_list)
+        tuple: (model, index, doc_list, doc_control_ids)
             - model: The SentenceTransformer model.
             - index: The FAISS index.
             - doc_list: The list of documents.
+            - doc_control_ids: For each document, the frozenset of normalized control IDs it mentions.
 
     Example:
-        >>> model, index, doc_list = build_vector_store(['doc1', 'doc2'], 'all-mpnet-base-v2', 'knowledge')
+        >>> model, index, doc_list, doc_control_ids = build_vector_store(['doc1', 'doc2'], 'all-mpnet-base-v2', 'knowledge')
     """
-    index_file = os.path.join(knowledge_dir, f"faiss_index_{hashlib.md5(model_name.encode()).hexdigest()}.pkl")
+    # The index is stored in FAISS's native format, with the documents and their control IDs pickled alongside it
+    index_base = os.path.join(knowledge_dir, f"faiss_index_hnsw_sq16_ip_{hashlib.md5(model_name.encode()).hexdigest()}")
+    index_file = f"{index_base}.faiss"
+    docs_file = f"{index_base}.documents.v{DOCS_CACHE_VERSION}.pkl"
     model = SentenceTransformer(model_name)
     logging.info(f"Load pretrained SentenceTransformer: {model_name}")
     
-    if os.path.exists(index_file):
-        with open(index_file, 'rb') as f:
-            index, doc_list = pickle.load(f)
+    if os.path.exists(index_file) and os.path.exists(docs_file):
+        index = faiss.read_index(index_file)
+        with open(docs_file, 'rb') as f:
+            doc_list, doc_control_ids = pickle.load(f)
         logging.info(f"Loaded existing FAISS index from {index_file}")
     else:
-        embeddings = model.encode(documents, show_progress_bar=True)
+        embeddings = model.encode(documents, show_progress_bar=True, normalize_embeddings=True)
         dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.train(embeddings)
         index.add(embeddings)
         doc_list = documents
-        with open(index_file, 'wb') as f:
-            pickle.dump((index, doc_list), f)
+        doc_control_ids = [
+            frozenset(normalize_control_id(match.upper()) for match in _CONTROL_ID_RE.findall(doc))
+            for doc in doc_list
+        ]
+        with open(docs_file, 'wb') as f:
+            pickle.dump((doc_list, doc_control_ids), f, protocol=pickle.HIGHEST_PROTOCOL)
+        faiss.write_index(index, index_file)
         logging.info(f"Built new FAISS index and saved to {index_file}")
-    return model, index, doc_list
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return model, index, doc_list, doc_control_ids
 
-def retrieve_documents(query, model, index, doc_list, top_k=100):
+def retrieve_documents(query, model, index, doc_list, top_k=100, doc_control_ids=None):
     """
     Retrieve the top-k most relevant documents for a given query.
 
@@ -54,22 +87,72 @@ def retrieve_documents(query, model, index, doc_list, top_k=100):
         index (faiss.Index): The FAISS index.
         doc_list (list): The list of documents.
         top_k (int, optional): Number of documents to retrieve. Defaults to 100.
+        doc_control_ids (list, optional): Per-document control ID sets from build_vector_store. When given,
+            the control ID filter is a set lookup instead of a substring search. Defaults to None.
 
     Returns:
         list: The top-k relevant documents.
 
     Example:
-        >>> retrieved = retrieve_documents('How to implement AC-1?', model, index, doc_list)
+        >>> retrieved = retrieve_documents('How to implement AC-1?', model, index, doc_list, doc_control_ids=doc_control_ids)
         >>> print(len(retrieved))
         100
     """
-    query_embedding = model.encode([query])
+    query_embedding = _encode_query(model, query)
     distances, indices = index.search(query_embedding, top_k)
-    retrieved_docs = [doc_list[idx] for idx in indices[0]]
-    # Filter for exact control ID match if present in query
-    control_match = re.search(r'(\w{2}-\d+(?:\([a-z0-9]+\))?)', query, re.IGNORECASE)
-    if control_match:
-        control_id = normalize_control_id(control_match.group(1).upper())
-        retrieved_docs = [doc for doc in retrieved_docs if control_id in doc] or retrieved_docs[:5]  # Fallback to top 5 if no exact match
+    retrieved_docs = _filter_by_control(query, indices[0], doc_list, doc_control_ids)
     logging.info(f"Retrieved {len(retrieved_docs)} documents for query")
     return retrieved_docs
+
+def retrieve_documents_batch(queries, model, index, doc_list, top_k=100, doc_control_ids=None):
+    """
+    Retrieve the top-k most relevant documents for each of several queries.
+
+    All queries are encoded in one batch and searched with a single FAISS call, which is much cheaper
+    than calling retrieve_documents once per query.
+
+    Args:
+        queries (list): The query strings.
+        model (SentenceTransformer): The SentenceTransformer model.
+        index (faiss.Index): The FAISS index.
+        doc_list (list): The list of documents.
+        top_k (int, optional): Number of documents to retrieve per query. Defaults to 100.
+        doc_control_ids (list, optional): Per-document control ID sets from build_vector_store. Defaults to None.
+
+    Returns:
+        list: One list of relevant documents per query, in the same order as queries.
+
+    Example:
+        >>> results = retrieve_documents_batch(['assess AC-2', 'implement AU-3'], model, index, doc_list)
+        >>> print(len(results))
+        2
+    """
+    if not queries:
+        return []
+    query_embeddings = model.encode(queries, batch_size=32, normalize_embeddings=True)
+    distances, indices = index.search(query_embeddings, top_k)
+    results = [
+        _filter_by_control(query, row, doc_list, doc_control_ids)
+        for query, row in zip(queries, indices)
+    ]
+    logging.info(f"Retrieved documents for {len(queries)} queries")
+    return results
+
+@lru_cache(maxsize=QUERY_EMBEDDING_CACHE_SIZE)
+def _encode_query(model, query):
+    """Normalized (1, dim) embedding of a single query, memoized per model and query string."""
+    embedding = model.encode([query], normalize_embeddings=True)
+    embedding.flags.writeable = False  # Shared between cache hits
+    return embedding
+
+def _filter_by_control(query, indices, doc_list, doc_control_ids=None):
+    """Documents at the given indices that mention the query's control ID, falling back to the top 5 if none do."""
+    control_match = _CONTROL_ID_RE.search(query)
+    if not control_match:
+        return [doc_list[idx] for idx in indices]
+    control_id = normalize_control_id(control_match.group(1).upper())
+    if doc_control_ids is not None:
+        retrieved_docs = [doc_list[idx] for idx in indices if control_id in doc_control_ids[idx]]
+    else:
+        retrieved_docs = [doc_list[idx] for idx in indices if control_id in doc_list[idx]]
+    return retrieved_docs or [doc_list[idx] for idx in indices[:5]]  # Fallback to top 5 if no exact match